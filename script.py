@@ -2,31 +2,54 @@
 import argparse
 import logging
 import math
+import os
+import select
+import signal
+import struct
 import threading
 import time
-import uinput
 import evdev
-from evdev import InputDevice, ecodes
+from evdev import AbsInfo, InputDevice, UInput, ecodes
 
 # --- Configuration and Global Variables ---
-logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
-
 parser = argparse.ArgumentParser(description="Generic Wii U Pro Controller Mapping using evdev")
 parser.add_argument("--sensitivity", type=float, default=1.0, help="Mouse sensitivity multiplier")
 parser.add_argument("--mouse-device", type=str, required=True, help="Path to the evdev mouse device (e.g. /dev/input/eventX)")
 parser.add_argument("--keyboard-device", type=str, required=True, help="Path to the evdev keyboard device (e.g. /dev/input/eventY)")
+parser.add_argument("--verbose", action="store_true", help="Log every input event (INFO level)")
 args = parser.parse_args()
+logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                    format="%(asctime)s [%(levelname)s] %(message)s")
+log = logging.getLogger(__name__)
 MOUSE_SENSITIVITY = args.sensitivity
+# Mouse sensitivity as a 32.32 fixed-point multiplier so the mouse path stays in integer math.
+# The magnitude is rounded up so truncated products never land below int(dx * sensitivity).
+MOUSE_SENSITIVITY_Q32 = math.ceil(abs(MOUSE_SENSITIVITY) * 2**32)
+if MOUSE_SENSITIVITY < 0:
+    MOUSE_SENSITIVITY_Q32 = -MOUSE_SENSITIVITY_Q32
 MOUSE_DEVICE_PATH = args.mouse_device
 KEYBOARD_DEVICE_PATH = args.keyboard_device
 
-# Global state for the left analog stick (WASD) and right analog stick (camera control)
-left_analog = {"W": False, "A": False, "S": False, "D": False}
-right_analog = {"x": 0, "y": 0}
-right_analog_lock = threading.Lock()
-
-# Timer to reset right analog stick to center if no movement
-reset_timer = None
+# Global state for the left analog stick (WASD) and right analog stick (camera control).
+# Bitmask of held WASD keys (see WASD_BITS).
+wasd_bits = 0
+# Bitmask of held D-Pad keys (see DPAD_MAP) and the hat values last written to the device.
+dpad_bits = 0
+hat_x = 0
+hat_y = 0
+# Right stick position. Only the input thread reads or writes it (the reset thread asks it
+# to re-center through reset_pipe_w) and both axes are published together in one SYN
+# frame, so no lock is needed.
+right_x = 0
+right_y = 0
+
+# Monotonic deadline after which the reset thread re-centers the right analog stick,
+# and the event used to wake that thread when mouse movement arms a new deadline.
+reset_deadline = 0.0
+reset_wake = threading.Event()
+# Pipe the reset thread uses to ask the input thread to re-center the right analog stick,
+# so the reset is written as part of the input thread's frames instead of racing them.
+reset_pipe_r, reset_pipe_w = os.pipe()
 
 # Virtual controller axis ranges (using typical Linux joystick range)
 AXIS_MIN = -32768
@@ -35,12 +58,41 @@ AXIS_NEUTRAL = 0
 # Default tilt values for the left analog stick.
 DEFAULT_ANALOG_TILT = 32000
 ALT_ANALOG_TILT = 28000
+# Bit assigned to each movement key; ALT adds bit 4 when indexing LEFT_ANALOG_LUT.
+WASD_BITS = {"W": 1, "A": 2, "D": 4, "S": 8}
+
+def build_left_analog_lut():
+    """
+    Precompute the left analog stick (x, y) for all 32 WASD + ALT combinations.
+    Each vector is normalized so that its magnitude equals the effective tilt.
+    """
+    lut = []
+    for index in range(32):
+        tilt = ALT_ANALOG_TILT if index & 16 else DEFAULT_ANALOG_TILT
+        dx = bool(index & WASD_BITS["D"]) - bool(index & WASD_BITS["A"])
+        dy = bool(index & WASD_BITS["S"]) - bool(index & WASD_BITS["W"])
+        if dx == 0 and dy == 0:
+            lut.append((0, 0))
+        else:
+            length = math.sqrt(dx * dx + dy * dy)
+            lut.append((int(tilt * dx / length), int(tilt * dy / length)))
+    return tuple(lut)
+
+LEFT_ANALOG_LUT = build_left_analog_lut()
 
 # Global flag to halt inputs while the "APOSTROPHE" key is held.
 halt_inputs = False
 
-# A dictionary to keep track of currently pressed keys (by our logical names)
-pressed_keys = {}
+# Modifier state used for the left analog tilt and the force quit combination.
+ctrl_pressed = False
+alt_pressed = False
+q_pressed = False
+
+# Native layout of the kernel's struct input_event (struct timeval time; u16 type; u16 code; s32 value).
+# Events are unpacked straight from the device fd instead of allocating an InputEvent each.
+INPUT_EVENT = struct.Struct("llHHi")
+# Number of bytes requested per read: up to 64 whole events.
+READ_SIZE = INPUT_EVENT.size * 64
 
 # Mapping from evdev key codes to logical key names (for controller mapping)
 key_map = {
@@ -67,229 +119,414 @@ key_map = {
     ecodes.KEY_RIGHTSHIFT: "SHIFT"
 }
 
+# Mapping from logical key names to controller buttons
+BUTTON_MAP = {
+    "SPACE": ecodes.BTN_A,
+    "Q": ecodes.BTN_X,
+    "E": ecodes.BTN_Y,
+    "R": ecodes.BTN_B,
+    "CTRL": ecodes.BTN_TL,
+    "SHIFT": ecodes.BTN_TR2,
+    "ENTER": ecodes.BTN_START,
+    "M": ecodes.BTN_SELECT,
+}
+
+# D-Pad direction bits; opposing directions held together cancel out.
+DPAD_UP = 1
+DPAD_DOWN = 2
+DPAD_LEFT = 4
+DPAD_RIGHT = 8
+
+# Mapping from logical key names to D-Pad (direction bit, label)
+DPAD_MAP = {
+    "T": (DPAD_UP, "Up"),
+    "G": (DPAD_DOWN, "Down"),
+    "1": (DPAD_LEFT, "Left"),
+    "2": (DPAD_RIGHT, "Right"),
+}
+
+# Modifier roles baked into KEY_ACTIONS (0 = not a modifier).
+MOD_CTRL = 1
+MOD_ALT = 2
+MOD_Q = 3
+MOD_HALT = 4
+MODIFIER_MAP = {"CTRL": MOD_CTRL, "ALT": MOD_ALT, "Q": MOD_Q, "APOSTROPHE": MOD_HALT}
+
+def build_key_actions():
+    """
+    Precompute, per evdev key code, the key's modifier role, WASD bit, controller button
+    and D-Pad entry so the keyboard handler needs one lookup and no name compares per event.
+    """
+    return {
+        keycode: (MODIFIER_MAP.get(key_name, 0), WASD_BITS.get(key_name, 0),
+                  BUTTON_MAP.get(key_name), DPAD_MAP.get(key_name))
+        for keycode, key_name in key_map.items()
+    }
+
+KEY_ACTIONS = build_key_actions()
+
 # --- Create Virtual Controller Device ---
-controller = uinput.Device([
-    # Left analog stick axes
-    uinput.ABS_X + (AXIS_MIN, AXIS_MAX, 0, 0),
-    uinput.ABS_Y + (AXIS_MIN, AXIS_MAX, 0, 0),
-    # Right analog stick axes (for camera control)
-    uinput.ABS_RX + (0, 255, 0, 0),
-    uinput.ABS_RY + (0, 255, 0, 0),
-    # Standard buttons:
-    uinput.BTN_A,       # A Button (Interact / Roll)
-    uinput.BTN_B,       # B Button (Attack)
-    uinput.BTN_X,       # X Button (Use Item)
-    uinput.BTN_Y,       # Y Button (Use Item)
-    uinput.BTN_TL,      # L Button (Crouch / Pick Up)
-    uinput.BTN_TL2,     # ZL Button (Lock-On / Target)
-    uinput.BTN_TR2,     # ZR Button (Shield)
-    uinput.BTN_MODE,    # Mode Button (Parry / Defend)
-    uinput.BTN_START,   # Start Button (Pause / Menu)
-    uinput.BTN_SELECT,  # Select Button (Map)
-    # D-Pad axes (using ABS_HAT0X and ABS_HAT0Y)
-    uinput.ABS_HAT0X + (-1, 1, 0, 0),
-    uinput.ABS_HAT0Y + (-1, 1, 0, 0),
-])
-logging.info("Virtual controller created.")
+# Name and IDs match what python-uinput used to create, since SDL-based emulators build
+# the controller GUID from them and saved mappings would otherwise stop matching.
+controller = UInput({
+    ecodes.EV_KEY: [
+        ecodes.BTN_A,       # A Button (Interact / Roll)
+        ecodes.BTN_B,       # B Button (Attack)
+        ecodes.BTN_X,       # X Button (Use Item)
+        ecodes.BTN_Y,       # Y Button (Use Item)
+        ecodes.BTN_TL,      # L Button (Crouch / Pick Up)
+        ecodes.BTN_TL2,     # ZL Button (Lock-On / Target)
+        ecodes.BTN_TR2,     # ZR Button (Shield)
+        ecodes.BTN_MODE,    # Mode Button (Parry / Defend)
+        ecodes.BTN_START,   # Start Button (Pause / Menu)
+        ecodes.BTN_SELECT,  # Select Button (Map)
+    ],
+    ecodes.EV_ABS: [
+        # Left analog stick axes
+        (ecodes.ABS_X, AbsInfo(value=0, min=AXIS_MIN, max=AXIS_MAX, fuzz=0, flat=0, resolution=0)),
+        (ecodes.ABS_Y, AbsInfo(value=0, min=AXIS_MIN, max=AXIS_MAX, fuzz=0, flat=0, resolution=0)),
+        # Right analog stick axes (for camera control)
+        (ecodes.ABS_RX, AbsInfo(value=0, min=0, max=255, fuzz=0, flat=0, resolution=0)),
+        (ecodes.ABS_RY, AbsInfo(value=0, min=0, max=255, fuzz=0, flat=0, resolution=0)),
+        # D-Pad axes (using ABS_HAT0X and ABS_HAT0Y)
+        (ecodes.ABS_HAT0X, AbsInfo(value=0, min=-1, max=1, fuzz=0, flat=0, resolution=0)),
+        (ecodes.ABS_HAT0Y, AbsInfo(value=0, min=-1, max=1, fuzz=0, flat=0, resolution=0)),
+    ],
+}, name="python-uinput", bustype=0, vendor=0, product=0, version=0)
+log.info("Virtual controller created.")
+
+# Events for the frame being built by the input thread, packed as struct input_event so
+# flush_events() can hand the whole frame to the virtual device with a single write().
+pending_events = bytearray()
+SYN_REPORT_EVENT = INPUT_EVENT.pack(0, 0, ecodes.EV_SYN, ecodes.SYN_REPORT, 0)
 
 # --- Helper Functions ---
+def queue_event(etype, code, value):
+    """Append an event to the pending frame; it reaches the device on flush_events()."""
+    pending_events.extend(INPUT_EVENT.pack(0, 0, etype, code, value))
+
+def flush_events():
+    """Terminate the pending frame with a SYN_REPORT and write it to the virtual device in one syscall."""
+    if pending_events:
+        pending_events.extend(SYN_REPORT_EVENT)
+        os.write(controller.fd, pending_events)
+        pending_events.clear()
+
 def update_left_analog():
     """
-    Compute left analog stick position based on WASD keys and update the virtual device.
-    The resulting vector is normalized so that its magnitude equals the effective tilt.
+    Look up the left analog stick position for the held WASD keys and ALT state
+    and queue the update for the current frame.
     """
-    # Determine effective tilt based on ALT key state.
-    tilt = ALT_ANALOG_TILT if pressed_keys.get("ALT") else DEFAULT_ANALOG_TILT
-    dx = 0
-    dy = 0
-    if left_analog["A"]:
-        dx -= 1
-    if left_analog["D"]:
-        dx += 1
-    if left_analog["W"]:
-        dy -= 1
-    if left_analog["S"]:
-        dy += 1
-
-    if dx == 0 and dy == 0:
-        x = 0
-        y = 0
-    else:
-        length = math.sqrt(dx * dx + dy * dy)
-        x = int(tilt * dx / length)
-        y = int(tilt * dy / length)
-
-    controller.emit(uinput.ABS_X, x, syn=False)
-    controller.emit(uinput.ABS_Y, y)
-    logging.info(f"Left Analog updated: X={x}, Y={y}")
+    x, y = LEFT_ANALOG_LUT[alt_pressed << 4 | wasd_bits]
+    queue_event(ecodes.EV_ABS, ecodes.ABS_X, x)
+    queue_event(ecodes.EV_ABS, ecodes.ABS_Y, y)
+    if log.isEnabledFor(logging.INFO):
+        log.info("Left Analog updated: X=%d, Y=%d", x, y)
 
 def update_right_analog(dx, dy):
-    """Update right analog stick (camera control) based on relative mouse movement."""
-    global right_analog, reset_timer
-    with right_analog_lock:
-        right_analog["x"] = max(min(right_analog["x"] + int(dx * MOUSE_SENSITIVITY), 255), 0)
-        right_analog["y"] = max(min(right_analog["y"] + int(dy * MOUSE_SENSITIVITY), 255), 0)
-        rx = right_analog["x"]
-        ry = right_analog["y"]
-    controller.emit(uinput.ABS_RX, rx, syn=False)
-    controller.emit(uinput.ABS_RY, ry)
-    logging.info(f"Right Analog updated: RX={rx}, RY={ry}")
+    """
+    Update right analog stick (camera control) based on relative mouse movement.
+    The new position is queued for the current frame only if it changed.
+    """
+    global right_x, right_y
+    # Scale in fixed point, truncating the exact decimal product toward zero.
+    sx = dx * MOUSE_SENSITIVITY_Q32
+    sy = dy * MOUSE_SENSITIVITY_Q32
+    rx = right_x + (sx >> 32 if sx >= 0 else -(-sx >> 32))
+    ry = right_y + (sy >> 32 if sy >= 0 else -(-sy >> 32))
+    rx = 0 if rx < 0 else 255 if rx > 255 else rx
+    ry = 0 if ry < 0 else 255 if ry > 255 else ry
+    # Keep the reset pushed back while the mouse moves, even if the stick is pinned.
     schedule_right_analog_reset()
+    if rx == right_x and ry == right_y:
+        return
+    right_x = rx
+    right_y = ry
+    queue_event(ecodes.EV_ABS, ecodes.ABS_RX, rx)
+    queue_event(ecodes.EV_ABS, ecodes.ABS_RY, ry)
+    if log.isEnabledFor(logging.INFO):
+        log.info("Right Analog updated: RX=%d, RY=%d", rx, ry)
 
 def schedule_right_analog_reset(delay=0.1):
     """Schedule a reset of the right analog stick to center after a short delay."""
-    global reset_timer
-    if reset_timer is not None:
-        reset_timer.cancel()
-    reset_timer = threading.Timer(delay, reset_right_analog)
-    reset_timer.start()
+    global reset_deadline
+    reset_deadline = time.monotonic() + delay
+    if not reset_wake.is_set():
+        reset_wake.set()
+
+def right_analog_reset_loop():
+    """Re-center the right analog stick once its reset deadline passes without being pushed back."""
+    while True:
+        reset_wake.wait()
+        while True:
+            remaining = reset_deadline - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+                continue
+            reset_wake.clear()
+            # A deadline pushed between the check and clear did not re-set the event.
+            if reset_deadline <= time.monotonic():
+                break
+        os.write(reset_pipe_w, b"\0")
 
 def reset_right_analog():
-    """Reset the right analog stick to its center (128)."""
-    global right_analog
-    with right_analog_lock:
-        right_analog["x"] = 128
-        right_analog["y"] = 128
-    controller.emit(uinput.ABS_RX, 128, syn=False)
-    controller.emit(uinput.ABS_RY, 128)
-    logging.info("Right Analog reset to center.")
+    """Reset the right analog stick to its center (128) and queue it for the current frame."""
+    global right_x, right_y
+    right_x = 128
+    right_y = 128
+    queue_event(ecodes.EV_ABS, ecodes.ABS_RX, 128)
+    queue_event(ecodes.EV_ABS, ecodes.ABS_RY, 128)
+    if log.isEnabledFor(logging.INFO):
+        log.info("Right Analog reset to center.")
+
+def update_dpad():
+    """
+    Compute the D-Pad hat axes from the held direction keys and queue each axis whose
+    value changed for the current frame.
+    """
+    global hat_x, hat_y
+    x = bool(dpad_bits & DPAD_RIGHT) - bool(dpad_bits & DPAD_LEFT)
+    y = bool(dpad_bits & DPAD_DOWN) - bool(dpad_bits & DPAD_UP)
+    if x != hat_x:
+        hat_x = x
+        queue_event(ecodes.EV_ABS, ecodes.ABS_HAT0X, x)
+    if y != hat_y:
+        hat_y = y
+        queue_event(ecodes.EV_ABS, ecodes.ABS_HAT0Y, y)
 
 def log_button_event(button_name, pressed):
-    action = "pressed" if pressed else "released"
-    logging.info(f"Button {button_name} {action}")
+    if log.isEnabledFor(logging.INFO):
+        log.info("Button %s %s", button_name, "pressed" if pressed else "released")
 
 def emit_button(button, pressed):
-    controller.emit(button, int(pressed))
+    queue_event(ecodes.EV_KEY, button, int(pressed))
     log_button_event(button, pressed)
 
 def check_force_quit():
     """If CTRL, ALT and Q are pressed, force quit."""
-    if pressed_keys.get("CTRL") and pressed_keys.get("ALT") and pressed_keys.get("Q"):
-        logging.info("Force quit combination pressed. Exiting...")
-        exit(0)
-
-# --- Evdev Keyboard Listener ---
-def evdev_keyboard_listener(dev_path):
-    global halt_inputs
-    try:
-        dev = InputDevice(dev_path)
-        logging.info(f"Opened evdev keyboard device: {dev_path}")
-    except Exception as e:
-        logging.error(f"Failed to open keyboard device {dev_path}: {e}")
-        return
-
-    for event in dev.read_loop():
-        if event.type != ecodes.EV_KEY:
-            continue
-        keycode = event.code
-        value = event.value  # 1 for press, 0 for release, 2 for auto-repeat
-        if keycode not in key_map:
-            continue
-        key_name = key_map[keycode]
-
-        # Process apostrophe separately
-        if key_name == "APOSTROPHE":
-            if value == 1:
-                halt_inputs = True
-                logging.info("Input halted (apostrophe key held).")
-            elif value == 0:
-                halt_inputs = False
-                logging.info("Input resumed (apostrophe key released).")
-            continue
-
-        # Skip processing if inputs are halted
-        if halt_inputs:
-            continue
-
-        # Update global pressed_keys state
-        if value in (1, 2):
-            pressed_keys[key_name] = True
-        elif value == 0:
-            pressed_keys.pop(key_name, None)
-
-        check_force_quit()
-
-        # If ALT changes state, update left analog immediately.
-        if key_name == "ALT":
-            update_left_analog()
-
-        # Mapping Keyboard Keys:
-        # Movement: WASD for left analog.
-        if key_name in ["W", "A", "S", "D"]:
-            left_analog[key_name] = (value in (1, 2))
+    if ctrl_pressed and alt_pressed and q_pressed:
+        log.info("Force quit combination pressed. Exiting...")
+        # exit() here would only end the input thread; interrupt the main thread instead.
+        os.kill(os.getpid(), signal.SIGINT)
+
+# --- Evdev Keyboard Handler ---
+def make_keyboard_handler(dev):
+    """Return a function that drains and processes all queued events from the keyboard device."""
+    # Resolve constants and bound methods once instead of on every event.
+    EV_KEY = ecodes.EV_KEY
+    get_action = KEY_ACTIONS.get
+    iter_unpack = INPUT_EVENT.iter_unpack
+    read = os.read
+    fd = dev.fd
+
+    def process_batch():
+        global halt_inputs, wasd_bits, dpad_bits, ctrl_pressed, alt_pressed, q_pressed
+        left_dirty = False
+        # Drain the fd completely: with edge-triggered epoll there is no wakeup for leftovers.
+        while True:
+            try:
+                data = read(fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            for _sec, _usec, etype, code, value in iter_unpack(data):
+                # value: 1 for press, 0 for release, 2 for auto-repeat.
+                # Auto-repeat never changes controller state, so it is dropped here.
+                if etype != EV_KEY or value == 2:
+                    continue
+                action = get_action(code)
+                if action is None:
+                    continue
+                modifier, bit, button, dpad = action
+
+                # Process apostrophe separately
+                if modifier == MOD_HALT:
+                    if value:
+                        halt_inputs = True
+                        log.info("Input halted (apostrophe key held).")
+                    else:
+                        halt_inputs = False
+                        log.info("Input resumed (apostrophe key released).")
+                    continue
+
+                # Skip processing if inputs are halted
+                if halt_inputs:
+                    continue
+
+                # Update modifier state; only modifier keys can complete the force quit combination.
+                pressed = bool(value)
+                if modifier:
+                    if modifier == MOD_CTRL:
+                        ctrl_pressed = pressed
+                    elif modifier == MOD_ALT:
+                        alt_pressed = pressed
+                        # ALT changes the left analog tilt.
+                        left_dirty = True
+                    else:
+                        q_pressed = pressed
+                    check_force_quit()
+
+                # Mapping Keyboard Keys:
+                # Movement: WASD for left analog.
+                if bit:
+                    wasd_bits = wasd_bits | bit if pressed else wasd_bits & ~bit
+                    left_dirty = True
+
+                # Action Buttons and D-Pad simulation:
+                if button is not None:
+                    emit_button(button, pressed)
+                elif dpad is not None:
+                    dpad_bit, label = dpad
+                    dpad_bits = dpad_bits | dpad_bit if pressed else dpad_bits & ~dpad_bit
+                    # Per event, so a tap whose press and release share a batch still reaches the device.
+                    update_dpad()
+                    if log.isEnabledFor(logging.INFO):
+                        log.info("D-Pad %s %s.", label, "pressed" if pressed else "released")
+            # A short read means the queue is empty; new events raise a new edge.
+            if len(data) < READ_SIZE:
+                break
+
+        # Update the left analog at most once per drained batch.
+        if left_dirty:
             update_left_analog()
+        # Publish everything queued in this batch as a single frame.
+        flush_events()
+
+    return process_batch
+
+# --- Evdev Mouse Handler ---
+def make_mouse_handler(dev):
+    """Return a function that drains and processes all queued events from the mouse device."""
+    # Resolve constants and bound methods once instead of on every event.
+    EV_REL = ecodes.EV_REL
+    EV_SYN = ecodes.EV_SYN
+    EV_KEY = ecodes.EV_KEY
+    REL_X = ecodes.REL_X
+    REL_Y = ecodes.REL_Y
+    SYN_REPORT = ecodes.SYN_REPORT
+    SYN_DROPPED = ecodes.SYN_DROPPED
+    BTN_LEFT = ecodes.BTN_LEFT
+    BTN_RIGHT = ecodes.BTN_RIGHT
+    BTN_MIDDLE = ecodes.BTN_MIDDLE
+    BTN_B = ecodes.BTN_B
+    BTN_TL2 = ecodes.BTN_TL2
+    BTN_MODE = ecodes.BTN_MODE
+    iter_unpack = INPUT_EVENT.iter_unpack
+    read = os.read
+    fd = dev.fd
+    # Relative motion is accumulated until SYN_REPORT so each report emits once.
+    # A report may span several reads, so the totals live outside process_batch.
+    dx = 0
+    dy = 0
+    # Set after SYN_DROPPED: the next report is incomplete and is discarded.
+    dropped = False
 
-        # Action Buttons:
-        if key_name == "SPACE":
-            emit_button(uinput.BTN_A, value in (1, 2))
-        if key_name == "Q":
-            emit_button(uinput.BTN_X, value in (1, 2))
-        if key_name == "E":
-            emit_button(uinput.BTN_Y, value in (1, 2))
-        if key_name == "R":
-            emit_button(uinput.BTN_B, value in (1, 2))
-        if key_name == "CTRL":
-            emit_button(uinput.BTN_TL, value in (1, 2))
-        if key_name == "SHIFT":
-            emit_button(uinput.BTN_TR2, value in (1, 2))
-        if key_name == "ENTER":
-            emit_button(uinput.BTN_START, value in (1, 2))
-        if key_name == "M":
-            emit_button(uinput.BTN_SELECT, value in (1, 2))
-        # D-Pad simulation:
-        if key_name == "T":
-            controller.emit(uinput.ABS_HAT0Y, -1 if value in (1, 2) else 0)
-            logging.info("D-Pad Up " + ("pressed." if value in (1, 2) else "released."))
-        if key_name == "G":
-            controller.emit(uinput.ABS_HAT0Y, 1 if value in (1, 2) else 0)
-            logging.info("D-Pad Down " + ("pressed." if value in (1, 2) else "released."))
-        if key_name == "1":
-            controller.emit(uinput.ABS_HAT0X, -1 if value in (1, 2) else 0)
-            logging.info("D-Pad Left " + ("pressed." if value in (1, 2) else "released."))
-        if key_name == "2":
-            controller.emit(uinput.ABS_HAT0X, 1 if value in (1, 2) else 0)
-            logging.info("D-Pad Right " + ("pressed." if value in (1, 2) else "released."))
-
-# --- Evdev Mouse Listener ---
-def evdev_mouse_listener(dev_path):
-    try:
-        dev = InputDevice(dev_path)
-        logging.info(f"Opened evdev mouse device: {dev_path}")
-    except Exception as e:
-        logging.error(f"Failed to open mouse device {dev_path}: {e}")
-        return
-
-    for event in dev.read_loop():
+    def process_batch():
+        nonlocal dx, dy, dropped
+        # The keyboard handler runs on this same thread, so the halt flag cannot change
+        # mid-batch: check it once and drain without processing while inputs are halted.
         if halt_inputs:
-            continue
-        if event.type == ecodes.EV_REL:
+            try:
+                while len(read(fd, READ_SIZE)) == READ_SIZE:
+                    pass
+            except BlockingIOError:
+                pass
             dx = 0
             dy = 0
-            if event.code == ecodes.REL_X:
-                dx = event.value
-            elif event.code == ecodes.REL_Y:
-                dy = event.value
-            if dx or dy:
-                update_right_analog(dx, dy)
-        elif event.type == ecodes.EV_KEY:
-            if event.code == ecodes.BTN_LEFT:
-                emit_button(uinput.BTN_B, event.value == 1)
-            elif event.code == ecodes.BTN_RIGHT:
-                emit_button(uinput.BTN_TL2, event.value == 1)
-            elif event.code == ecodes.BTN_MIDDLE:
-                emit_button(uinput.BTN_MODE, event.value == 1)
-
-# --- Start Listener Threads ---
-keyboard_thread = threading.Thread(target=evdev_keyboard_listener, args=(KEYBOARD_DEVICE_PATH,), daemon=True)
-mouse_thread = threading.Thread(target=evdev_mouse_listener, args=(MOUSE_DEVICE_PATH,), daemon=True)
-keyboard_thread.start()
-mouse_thread.start()
-
-logging.info("Evdev keyboard and mouse listeners started. (Force quit with CTRL+ALT+Q)")
+            return
+        # Drain the fd completely: with edge-triggered epoll there is no wakeup for leftovers.
+        while True:
+            try:
+                data = read(fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            for _sec, _usec, etype, code, value in iter_unpack(data):
+                if etype == EV_REL:
+                    if code == REL_X:
+                        dx += value
+                    elif code == REL_Y:
+                        dy += value
+                elif etype == EV_SYN:
+                    if code == SYN_REPORT:
+                        if dropped:
+                            dropped = False
+                        elif dx or dy:
+                            update_right_analog(dx, dy)
+                        dx = 0
+                        dy = 0
+                    elif code == SYN_DROPPED:
+                        dropped = True
+                elif etype == EV_KEY:
+                    if code == BTN_LEFT:
+                        emit_button(BTN_B, value == 1)
+                    elif code == BTN_RIGHT:
+                        emit_button(BTN_TL2, value == 1)
+                    elif code == BTN_MIDDLE:
+                        emit_button(BTN_MODE, value == 1)
+            # A short read means the queue is empty; new events raise a new edge.
+            if len(data) < READ_SIZE:
+                break
+        # Publish everything queued in this batch as a single frame.
+        flush_events()
+
+    return process_batch
+
+# --- Input Loop ---
+def process_reset_request():
+    """Re-center the right analog stick on behalf of the reset thread, as its own frame."""
+    # Drain every pending request: with edge-triggered epoll there is no wakeup for leftovers.
+    try:
+        while len(os.read(reset_pipe_r, 64)) == 64:
+            pass
+    except BlockingIOError:
+        pass
+    reset_right_analog()
+    flush_events()
+
+def evdev_input_loop(keyboard_dev, mouse_dev):
+    """
+    Wait on both devices and the reset pipe with a single epoll and handle whichever
+    became readable. This is the only thread that writes to the virtual device.
+    """
+    handlers = {
+        keyboard_dev.fd: make_keyboard_handler(keyboard_dev),
+        mouse_dev.fd: make_mouse_handler(mouse_dev),
+        reset_pipe_r: process_reset_request,
+    }
+    epoll = select.epoll()
+    for fd in handlers:
+        # Edge-triggered: one wakeup per empty -> readable transition, each handler drains fully.
+        os.set_blocking(fd, False)
+        epoll.register(fd, select.EPOLLIN | select.EPOLLET)
+    poll = epoll.poll
+    while True:
+        for fd, _ in poll():
+            handlers[fd]()
+
+# --- Open Devices and Start Threads ---
+try:
+    keyboard_dev = InputDevice(KEYBOARD_DEVICE_PATH)
+    log.info(f"Opened evdev keyboard device: {KEYBOARD_DEVICE_PATH}")
+except Exception as e:
+    log.error(f"Failed to open keyboard device {KEYBOARD_DEVICE_PATH}: {e}")
+    exit(1)
+try:
+    mouse_dev = InputDevice(MOUSE_DEVICE_PATH)
+    log.info(f"Opened evdev mouse device: {MOUSE_DEVICE_PATH}")
+except Exception as e:
+    log.error(f"Failed to open mouse device {MOUSE_DEVICE_PATH}: {e}")
+    exit(1)
+
+input_thread = threading.Thread(target=evdev_input_loop, args=(keyboard_dev, mouse_dev), daemon=True)
+reset_thread = threading.Thread(target=right_analog_reset_loop, daemon=True)
+input_thread.start()
+reset_thread.start()
+
+log.info("Evdev input loop started. (Force quit with CTRL+ALT+Q)")
 
+# Block the main thread without periodic wakeups until a signal arrives.
 try:
     while True:
-        time.sleep(0.1)
+        signal.pause()
 except KeyboardInterrupt:
-    logging.info("Exiting due to KeyboardInterrupt.")
+    log.info("Exiting due to KeyboardInterrupt.")
     exit(0)